@@ -1,11 +1,28 @@
+import io
 import os
+import re
 import sys
+import itertools
+import json
+import shutil
+import subprocess
+import threading
+import multiprocessing
 import requests
+import xxhash
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from html import unescape
+from types import SimpleNamespace
+from urllib.parse import urlparse
 import pypandoc
 from canvasapi import Canvas
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pathvalidate import sanitize_filename
 from tqdm import tqdm
-from weasyprint import HTML
+from weasyprint import CSS, HTML, default_url_fetcher
+from weasyprint.text.fonts import FontConfiguration
 from dotenv import load_dotenv
 
 # CROSS-PLATFORM SYSTEM WRAPPER for Mac-Windows compatibility (I haven't tested Linux yet)
@@ -27,6 +44,18 @@ load_dotenv()
 API_URL = os.getenv("CANVAS_API_URL", "https://dlsu.instructure.com")
 API_KEY = os.getenv("API_KEY")
 OUTPUT_DIR = "DLSU_Canvas_Archive"
+CACHE_DIR = ".archive_cache"
+MAX_WORKERS = int(os.getenv("ARCHIVE_WORKERS", "8"))
+# Canvas repeats course/module names thousands of times across items;
+# memoizing sanitization keeps it out of the per-item hot path.
+sanitize_filename_cached = lru_cache(maxsize=4096)(sanitize_filename)
+# The original .docx is already lossless; the PDF copy is convenience and
+# by far the slowest per-item step, so it's opt-in.
+CONVERT_DOCX = bool(os.getenv("CONVERT_DOCX"))
+# With VERIFY_ARCHIVE=1, skipped files are re-hashed against their recorded
+# xxh3 digest instead of trusting size/updated_at alone — a full re-read
+# per file, so off by default.
+VERIFY_ARCHIVE = bool(os.getenv("VERIFY_ARCHIVE"))
 
 # Print absolute path to help user find the data
 ABS_OUTPUT_PATH = os.path.abspath(OUTPUT_DIR)
@@ -34,47 +63,503 @@ ABS_OUTPUT_PATH = os.path.abspath(OUTPUT_DIR)
 if not API_KEY:
     raise ValueError("FATAL: CANVAS_API_KEY not found. Check your .env file.")
 
+# Shared HTTP session: Canvas file URLs all point at a handful of hosts
+# (instructure CDN / S3), so pooled keep-alive connections avoid paying a
+# fresh TCP+TLS handshake for every single file. With the Brotli package
+# installed, urllib3 also advertises "br" alongside gzip, shrinking the
+# many small JSON/HTML API responses further.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+))
+
 def init_canvas():
-    return Canvas(API_URL, API_KEY)
+    canvas = Canvas(API_URL, API_KEY)
+    # canvasapi builds its own internal session; swap in the pooled one so
+    # API pagination calls reuse connections too.
+    requester = getattr(canvas, '_Canvas__requester', None)
+    if requester is not None and hasattr(requester, '_session'):
+        requester._session = SESSION
+    return canvas
+
+# Progress bars default to terminal row 0, so concurrent download threads
+# overwrite each other's lines. Each thread claims a stable row on first
+# use instead.
+_BAR_SLOT = threading.local()
+_BAR_COUNTER = itertools.count()
+
+def _bar_position():
+    position = getattr(_BAR_SLOT, 'position', None)
+    if position is None:
+        position = next(_BAR_COUNTER) % MAX_WORKERS
+        _BAR_SLOT.position = position
+    return position
+
+class _ProgressReader:
+    """File-like wrapper that ticks a tqdm bar as it is read from."""
+    def __init__(self, raw, bar):
+        self.raw = raw
+        self.bar = bar
+
+    def read(self, n):
+        buf = self.raw.read(n)
+        self.bar.update(len(buf))
+        return buf
 
 def download_file(url, filepath, file_size):
+    # Stream into a .part file and rename into place only once the body is
+    # complete — an interrupted run can never leave a torn file at the
+    # final path.
+    tmp_path = filepath + ".part"
     try:
-        response = requests.get(url, stream=True, timeout=30)
+        response = SESSION.get(url, stream=True, timeout=30)
         response.raise_for_status()
-        with open(filepath, 'wb') as f, tqdm(
+        response.raw.decode_content = True
+        with open(tmp_path, 'wb') as f, tqdm(
             desc=os.path.basename(filepath),
             total=file_size,
             unit='iB',
             unit_scale=True,
             unit_divisor=1024,
-            leave=False
+            leave=False,
+            position=_bar_position()
         ) as bar:
-            for chunk in response.iter_content(chunk_size=8192):
-                size = f.write(chunk)
-                bar.update(size)
+            # copyfileobj with 1MB chunks instead of iter_content's 8KB —
+            # far fewer Python-level write/update round-trips per file.
+            shutil.copyfileobj(_ProgressReader(response.raw, bar), f, length=1 << 20)
+        os.replace(tmp_path, filepath)
         return True
     except Exception as e:
         print(f"    [ERROR] Download failed: {e}")
-        if os.path.exists(filepath): os.remove(filepath)
+        if os.path.exists(tmp_path): os.remove(tmp_path)
         return False
 
-def save_page_as_pdf(page, output_path):
+# WeasyPrint layout and pandoc conversion are CPU-bound, so they run in a
+# process pool: renders spread across cores while the download threads keep
+# the network busy instead of stalling behind each render. Workers are
+# spawned, not forked: the pool starts lazily from a download thread, and a
+# forked child would inherit the parent's live pooled sockets and lock
+# state mid-request. Spawned workers re-import this module and get their
+# own SESSION for asset fetches.
+PDF_POOL = ProcessPoolExecutor(
+    max_workers=max(2, (os.cpu_count() or 2) - 1),
+    mp_context=multiprocessing.get_context('spawn'))
+PDF_FUTURES = []
+
+# Built once per process: WeasyPrint otherwise redoes Pango/FontConfig
+# setup on every write_pdf call.
+FONT_CONFIG = FontConfiguration()
+BASE_CSS = CSS(string="@page{margin:1cm} body{font-family:sans-serif}", font_config=FONT_CONFIG)
+
+# Only fetch page assets (images etc.) from Canvas itself — WeasyPrint
+# otherwise downloads every linked stylesheet/font/tracker serially.
+ASSET_HOST_ALLOWLIST = (urlparse(API_URL).netloc, '.instructure.com', '.canvas-user-content.com')
+IMG_SRC_RE = re.compile(r'<img[^>]+src="([^"]+)"')
+
+@lru_cache(maxsize=1024)
+def _fetch_asset(url):
+    response = SESSION.get(url, timeout=30)
+    response.raise_for_status()
+    mime_type = response.headers.get('Content-Type', 'application/octet-stream').split(';')[0]
+    return response.content, mime_type
+
+def _warm_asset(url):
+    try:
+        _fetch_asset(url)
+    except Exception:
+        pass  # surfaced (and logged by WeasyPrint) at render time
+
+def _prefetch_assets(full_html):
+    """Fetch a page's embedded images concurrently before rendering.
+
+    WeasyPrint pulls assets one at a time mid-render; warming the cache
+    up front overlaps those fetches instead. Repeated assets (course
+    logos, icons) are served from the LRU cache across pages.
+    """
+    urls = [unescape(u) for u in IMG_SRC_RE.findall(full_html)]
+    urls = [u for u in urls if urlparse(u).netloc.endswith(ASSET_HOST_ALLOWLIST)]
+    if len(urls) > 1:
+        with ThreadPoolExecutor(max_workers=min(8, len(urls))) as prefetch_pool:
+            list(prefetch_pool.map(_warm_asset, urls))
+
+def _page_url_fetcher(url):
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https'):
+        # data: URIs (pasted/inline images) and other non-network schemes
+        # cost no fetch — hand them to WeasyPrint's own fetcher untouched.
+        return default_url_fetcher(url)
+    if not parsed.netloc.endswith(ASSET_HOST_ALLOWLIST):
+        return {'string': b'', 'mime_type': 'text/plain'}
+    data, mime_type = _fetch_asset(url)
+    return {'string': data, 'mime_type': mime_type, 'redirected_url': url}
+
+def strip_static_assets(body):
+    """Remove stylesheet links and scripts from Canvas page HTML.
+
+    Pages drag in hundreds of KB of Bootstrap/Canvas bundle CSS and JS
+    that only styles the web UI; WeasyPrint would fetch and parse all of
+    it per page for no visual gain in the archived PDF.
+    """
+    body = re.sub(r'<link[^>]+rel=["\']?stylesheet["\']?[^>]*>', '', body, flags=re.I)
+    body = re.sub(r'<script\b[^>]*>.*?</script>', '', body, flags=re.S | re.I)
+    return body
+
+def _render_html_to_pdf(title, body, output_path):
     try:
-        if hasattr(page, 'body') and page.body:
-            full_html = f"<html><head><meta charset='utf-8'></head><body><h1>{page.title}</h1>{page.body}</body></html>"
-            HTML(string=full_html).write_pdf(output_path)
-            print(f"    [SAVED] Page saved as PDF: {os.path.basename(output_path)}")
+        _prefetch_assets(body)
+        # Assemble the document as bytes rather than concatenating one big
+        # f-string — long Canvas pages otherwise cost a multi-MB transient
+        # string copy per render.
+        buf = io.BytesIO()
+        buf.write(b"<html><head><meta charset='utf-8'></head><body><h1>")
+        buf.write(title.encode())
+        buf.write(b"</h1>")
+        buf.write(body.encode())
+        buf.write(b"</body></html>")
+        buf.seek(0)
+        HTML(file_obj=buf, url_fetcher=_page_url_fetcher).write_pdf(
+            output_path, stylesheets=[BASE_CSS], font_config=FONT_CONFIG)
+        print(f"    [SAVED] Page saved as PDF: {os.path.basename(output_path)}")
     except Exception as e:
         print(f"    [ERROR] WeasyPrint Failed: {e}")
 
-def convert_docx_to_pdf(docx_path):
-    pdf_path = os.path.splitext(docx_path)[0] + ".pdf"
+def save_page_as_pdf(page, output_path):
+    if hasattr(page, 'body') and page.body:
+        body = strip_static_assets(page.body)
+        PDF_FUTURES.append(PDF_POOL.submit(_render_html_to_pdf, page.title, body, output_path))
+
+def _convert_docx_worker(docx_path, pdf_path):
     try:
         pypandoc.convert_file(docx_path, 'pdf', outputfile=pdf_path, extra_args=['--pdf-engine=weasyprint'])
         print(f"    [CONVERTED] DOCX to PDF: {os.path.basename(pdf_path)}")
     except Exception as e:
         print(f"    [ERROR] DOCX to PDF conversion failed: {e}")
 
+def convert_docx_to_pdf(docx_path):
+    pdf_path = os.path.splitext(docx_path)[0] + ".pdf"
+    PDF_FUTURES.append(PDF_POOL.submit(_convert_docx_worker, docx_path, pdf_path))
+
+LIBREOFFICE = shutil.which('libreoffice') or shutil.which('soffice')
+
+def convert_docx_batch(docx_paths, target_dir):
+    """Convert a module's worth of .doc/.docx files to PDF in one pass.
+
+    One headless LibreOffice invocation amortizes its ~1-2s startup
+    across the whole batch; without LibreOffice each file falls back to
+    the pandoc+WeasyPrint path.
+    """
+    if not docx_paths:
+        return
+    if LIBREOFFICE:
+        try:
+            subprocess.run(
+                [LIBREOFFICE, '--headless', '--convert-to', 'pdf', '--outdir', target_dir, *docx_paths],
+                check=True, capture_output=True, timeout=600)
+            print(f"    [CONVERTED] {len(docx_paths)} document(s) to PDF")
+            return
+        except Exception as e:
+            print(f"    [WARN] LibreOffice conversion failed, falling back to pandoc: {e}")
+    for docx_path in docx_paths:
+        convert_docx_to_pdf(docx_path)
+
+def drain_pdf_futures():
+    while PDF_FUTURES:
+        PDF_FUTURES.pop().result()
+
+# Validity cache for downloaded files: filepath -> {size, updated_at, xxh3}.
+# A bare os.path.exists check can't tell when Canvas replaced a file under
+# the same name, or when a previous run left a truncated download behind.
+FILE_CACHE_PATH = os.path.join(CACHE_DIR, "files.json")
+FILE_CACHE_LOCK = threading.Lock()
+try:
+    with open(FILE_CACHE_PATH) as _f:
+        FILE_CACHE = json.load(_f)
+except (OSError, ValueError):
+    FILE_CACHE = {}
+
+def hash_file(filepath):
+    h = xxhash.xxh3_128()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def record_file(filepath, file_obj, digest=None):
+    entry = {
+        'size': getattr(file_obj, 'size', None),
+        'updated_at': getattr(file_obj, 'updated_at', None),
+        'xxh3': digest or hash_file(filepath),
+    }
+    with FILE_CACHE_LOCK:
+        FILE_CACHE[filepath] = entry
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(FILE_CACHE_PATH, 'w') as f:
+            json.dump(FILE_CACHE, f)
+
+# Content-addressed blob store: the same syllabus/template file is often
+# attached to several courses, and each attachment gets its own Canvas file
+# id. Blobs are keyed by (Content-Length, ETag) from a HEAD request — for
+# S3-backed Canvas storage the ETag is content-derived, so identical
+# uploads collapse to one download plus hard links.
+BLOB_DIR = os.path.join(CACHE_DIR, "blobs")
+BLOB_INDEX_PATH = os.path.join(CACHE_DIR, "blobs.json")
+BLOB_LOCK = threading.Lock()
+try:
+    with open(BLOB_INDEX_PATH) as _f:
+        BLOB_INDEX = json.load(_f)
+except (OSError, ValueError):
+    BLOB_INDEX = {}
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:  # cross-device or filesystem without hard links
+        shutil.copyfile(src, dst)
+
+def _blob_key(url):
+    try:
+        head = SESSION.head(url, timeout=30, allow_redirects=True)
+        etag = head.headers.get('ETag')
+        length = head.headers.get('Content-Length')
+        if etag and length:
+            return f"{length}:{etag}"
+    except requests.RequestException:
+        pass
+    return None
+
+def download_file_deduped(file_obj, filepath):
+    """Download a Canvas file through the blob store.
+
+    A repeat of an already-stored blob is hard-linked into place with no
+    network transfer; anything else downloads normally and is then added
+    to the store. Returns the file's xxh3 digest (blob names are the
+    digest of their content) on success, None on failure, so callers can
+    record it without hashing the file a second time.
+    """
+    key = _blob_key(file_obj.url)
+    if key:
+        with BLOB_LOCK:
+            blob_name = BLOB_INDEX.get(key)
+        if blob_name:
+            blob_path = os.path.join(BLOB_DIR, blob_name)
+            if os.path.exists(blob_path):
+                _link_or_copy(blob_path, filepath)
+                print(f"    [DEDUP] Linked from blob store: {os.path.basename(filepath)}")
+                return blob_name
+
+    if not download_file(file_obj.url, filepath, file_obj.size):
+        return None
+
+    digest = hash_file(filepath)
+    if key:
+        blob_path = os.path.join(BLOB_DIR, digest)
+        os.makedirs(BLOB_DIR, exist_ok=True)
+        if not os.path.exists(blob_path):
+            _link_or_copy(filepath, blob_path)
+        with BLOB_LOCK:
+            BLOB_INDEX[key] = digest
+            with open(BLOB_INDEX_PATH, 'w') as f:
+                json.dump(BLOB_INDEX, f)
+    return digest
+
+def file_is_current(filepath, file_obj, existing=None):
+    """Check whether an already-archived file still matches Canvas's copy.
+
+    `existing` is an optional set of directory-entry names (from one
+    scandir of the target directory) used in place of a stat call.
+    """
+    if existing is not None:
+        present = os.path.basename(filepath) in existing
+    else:
+        present = os.path.exists(filepath)
+    if not present:
+        return False
+    size = getattr(file_obj, 'size', None)
+    updated_at = getattr(file_obj, 'updated_at', None)
+    entry = FILE_CACHE.get(filepath)
+    if entry:
+        if entry.get('size') != size or entry.get('updated_at') != updated_at:
+            return False
+        if VERIFY_ARCHIVE:
+            # Deep check: re-hash the archived file against the digest
+            # recorded at download time to catch truncation/corruption
+            # that metadata comparison can't see.
+            if hash_file(filepath) != entry.get('xxh3'):
+                print(f"    [STALE] Digest mismatch, re-downloading: {os.path.basename(filepath)}")
+                return False
+        return True
+    # File from a pre-cache run: trust it if the size on disk matches,
+    # and backfill the cache entry so the next run skips the stat dance.
+    if size is not None and os.path.getsize(filepath) != size:
+        return False
+    record_file(filepath, file_obj)
+    return True
+
+def ensure_pandoc():
+    """Make sure pandoc is available, probing at most once.
+
+    get_pandoc_version() spawns pandoc as a subprocess just to check it
+    exists, so the result is remembered with a marker file.
+    """
+    marker = os.path.join(CACHE_DIR, "pandoc_ok")
+    if os.path.exists(marker):
+        return
+    try:
+        pypandoc.get_pandoc_version()
+    except OSError:
+        print("[INIT] Pandoc not found. Downloading binary...")
+        pypandoc.download_pandoc()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    open(marker, 'w').close()
+
+def load_course_cache(course_id):
+    cache_path = os.path.join(CACHE_DIR, "courses", f"{course_id}.json")
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_course_cache(course_id, data):
+    cache_dir = os.path.join(CACHE_DIR, "courses")
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, f"{course_id}.json"), 'w') as f:
+        json.dump(data, f)
+
+def get_course_updated_at(course):
+    """Fetch a course's updated_at with one cheap GET.
+
+    Course objects from get_courses() don't carry updated_at — it has to
+    be asked for explicitly — so the probe hits the single-course
+    endpoint with include[]=updated_at. Returns None when unavailable,
+    which just disables the listing cache for that course.
+    """
+    try:
+        response = course._requester.request(
+            'GET', f'courses/{course.id}', include=['updated_at'])
+        return response.json().get('updated_at')
+    except Exception:
+        return None
+
+def list_course_modules(course):
+    """Return [{"id", "name", "items": [...]}, ...] for a course.
+
+    Module/item listings paginate through the REST API, so the result is
+    cached on disk keyed by the course's updated_at timestamp — re-runs on
+    an unchanged course skip the listing calls entirely.
+    """
+    course_updated = get_course_updated_at(course)
+    cached = load_course_cache(course.id)
+    if course_updated and cached and cached.get('updated_at') == course_updated:
+        print(f"    [CACHE] Course unchanged since {course_updated}, using cached listing")
+        return cached['modules']
+
+    modules_data = []
+    for module in course.get_modules(per_page=100):
+        items = [{
+            'id': item.id,
+            'type': item.type,
+            'title': item.title,
+            'content_id': getattr(item, 'content_id', None),
+            'page_url': getattr(item, 'page_url', None),
+        } for item in module.get_module_items(per_page=100)]
+        modules_data.append({'id': module.id, 'name': module.name, 'items': items})
+
+    if course_updated:
+        save_course_cache(course.id, {'updated_at': course_updated, 'modules': modules_data})
+    return modules_data
+
+def prefetch_course_content(course):
+    """Fetch a course's file and page listings up front.
+
+    Each File item otherwise costs its own GET /api/v1/files/{id}, and
+    each Page its own page fetch — a classic N+1. One paginated listing
+    per endpoint replaces all of those; get_pages(include=['body'])
+    returns page bodies inline.
+    """
+    files_by_id, pages_by_url = {}, {}
+    try:
+        files_by_id = {f.id: f for f in course.get_files(per_page=100)}
+    except Exception as e:
+        print(f"    [WARN] Could not prefetch files list: {e}")
+    try:
+        pages_by_url = {p.url: p for p in course.get_pages(include=['body'], per_page=100)}
+    except Exception as e:
+        print(f"    [WARN] Could not prefetch pages list: {e}")
+    return files_by_id, pages_by_url
+
+# Canvas allows duplicate item titles in one module, which sanitize to the
+# same save path. With items running concurrently, both would pass the
+# existence check and interleave writes into the same .part file, so each
+# path must be claimed before downloading — first claimant wins, the rest
+# skip, matching the serial loop's silent-skip behavior.
+CLAIMED_PATHS = set()
+CLAIMED_PATHS_LOCK = threading.Lock()
+
+def claim_path(save_path):
+    with CLAIMED_PATHS_LOCK:
+        if save_path in CLAIMED_PATHS:
+            return False
+        CLAIMED_PATHS.add(save_path)
+        return True
+
+def archive_item(course, item, target_dir, files_by_id=None, pages_by_url=None, existing=None):
+    """Archive a single module item (File or Page) into target_dir.
+
+    Self-contained per-item unit of work so items can be scheduled
+    independently of the course/module listing loop. Returns the saved
+    path of a document still awaiting PDF conversion, else None.
+    `existing` is the set of names already in target_dir (one scandir
+    per module replaces per-item stat calls).
+    """
+    if existing is None:
+        existing = {entry.name for entry in os.scandir(target_dir)}
+    safe_title = sanitize_filename_cached(item.title) or f"item_{item.id}"
+
+    if item.type == 'File':
+        try:
+            file_obj = (files_by_id or {}).get(item.content_id) or course.get_file(item.content_id)
+            ext = os.path.splitext(file_obj.filename)[1].lower()
+            clean_title = os.path.splitext(safe_title)[0]
+            save_path = os.path.join(target_dir, f"{clean_title}{ext}")
+
+            if file_is_current(save_path, file_obj, existing) or (ext in ['.doc', '.docx'] and f"{clean_title}.pdf" in existing):
+                print(f"    [SKIP] Already archived: {clean_title}")
+                return
+
+            if not claim_path(save_path):
+                print(f"    [SKIP] Duplicate item title in module: {clean_title}")
+                return
+
+            digest = download_file_deduped(file_obj, save_path)
+            if digest:
+                record_file(save_path, file_obj, digest)
+                existing.add(os.path.basename(save_path))
+                if ext in ['.doc', '.docx'] and CONVERT_DOCX:
+                    return save_path
+        except Exception as e:
+            print(f"    [FAIL] File error: {e}")
+
+    elif item.type == 'Page':
+        clean_title = os.path.splitext(safe_title)[0]
+        save_path = os.path.join(target_dir, f"{clean_title}.pdf")
+
+        if f"{clean_title}.pdf" not in existing:
+            if not claim_path(save_path):
+                print(f"    [SKIP] Duplicate page title in module: {clean_title}")
+                return
+            try:
+                page_obj = (pages_by_url or {}).get(item.page_url)
+                if page_obj is None or not getattr(page_obj, 'body', None):
+                    page_obj = course.get_page(item.page_url)
+                save_page_as_pdf(page_obj, save_path)
+            except Exception as e:
+                print(f"    [FAIL] Could not retrieve page {clean_title}: {e}")
+        else:
+            print(f"    [SKIP] Page already archived: {clean_title}")
+
 def main():
     print(f"[INIT] Archiving to: {ABS_OUTPUT_PATH}")
     try:
@@ -86,63 +571,53 @@ def main():
         print(f"[FATAL] Authentication failed: {e}")
         return
 
+    if CONVERT_DOCX:
+        ensure_pandoc()
+
+    # Items are independent downloads/renders, so fan them out across a
+    # thread pool — the work is I/O-bound and the GIL is released during
+    # socket reads.
+    pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
     try:
-        pypandoc.get_pandoc_version()
-    except OSError:
-        print("[INIT] Pandoc not found. Downloading binary...")
-        pypandoc.download_pandoc()
+        courses = list(user.get_courses(enrollment_state='active', per_page=100))
 
-    courses = list(user.get_courses(enrollment_state='active'))
+        for course in courses:
+            if not hasattr(course, 'name'): continue
+            safe_course_name = sanitize_filename_cached(course.name)
+            course_dir = os.path.join(ABS_OUTPUT_PATH, safe_course_name)
+            print(f"\n[COURSE] {safe_course_name}")
 
-    for course in courses:
-        if not hasattr(course, 'name'): continue
-        safe_course_name = sanitize_filename(course.name)
-        print(f"\n[COURSE] {safe_course_name}")
+            try:
+                modules = list_course_modules(course)
+                files_by_id, pages_by_url = prefetch_course_content(course)
+                for module in modules:
+                    safe_module_name = sanitize_filename_cached(module['name'])
+                    target_dir = os.path.join(course_dir, safe_module_name)
+                    os.makedirs(target_dir, exist_ok=True)
+                    existing = {entry.name for entry in os.scandir(target_dir)}
 
-        try:
-            modules = list(course.get_modules())
-            for module in modules:
-                safe_module_name = sanitize_filename(module.name)
-                target_dir = os.path.join(ABS_OUTPUT_PATH, safe_course_name, safe_module_name)
-                os.makedirs(target_dir, exist_ok=True)
-                
-                items = list(module.get_module_items())
-                for item in items:
-                    safe_title = sanitize_filename(item.title) or f"item_{item.id}"
-                    
-                    if item.type == 'File':
-                        try:
-                            file_obj = course.get_file(item.content_id)
-                            ext = os.path.splitext(file_obj.filename)[1].lower()
-                            clean_title = os.path.splitext(safe_title)[0]
-                            save_path = os.path.join(target_dir, f"{clean_title}{ext}")
-                            pdf_path = os.path.join(target_dir, f"{clean_title}.pdf")
-
-                            if os.path.exists(save_path) or (ext in ['.doc', '.docx'] and os.path.exists(pdf_path)):
-                                print(f"    [SKIP] Already archived: {clean_title}")
-                                continue
-
-                            if download_file(file_obj.url, save_path, file_obj.size):
-                                if ext in ['.doc', '.docx']:
-                                    convert_docx_to_pdf(save_path)
-                        except Exception as e:
-                            print(f"    [FAIL] File error: {e}")
-
-                    elif item.type == 'Page':
-                        clean_title = os.path.splitext(safe_title)[0]
-                        save_path = os.path.join(target_dir, f"{clean_title}.pdf")
-                        
-                        if not os.path.exists(save_path):
-                            try:
-                                page_obj = course.get_page(item.page_url)
-                                save_page_as_pdf(page_obj, save_path)
-                            except Exception as e:
-                                print(f"    [FAIL] Could not retrieve page {clean_title}: {e}")
-                        else:
-                            print(f"    [SKIP] Page already archived: {clean_title}")
+                    items = [SimpleNamespace(**record) for record in module['items']]
+                    futures = [pool.submit(archive_item, course, item, target_dir, files_by_id, pages_by_url, existing)
+                               for item in items]
+                    docx_batch = []
+                    for future in as_completed(futures):
+                        pending_docx = future.result()
+                        if pending_docx:
+                            docx_batch.append(pending_docx)
+                    convert_docx_batch(docx_batch, target_dir)
 
-        except Exception as e:
-            print(f" [WARN] Skipping course {safe_course_name} due to error: {e}")
+                # Wait for this course's renders so failures are reported
+                # under the right course heading.
+                drain_pdf_futures()
+
+            except Exception as e:
+                print(f" [WARN] Skipping course {safe_course_name} due to error: {e}")
+    finally:
+        pool.shutdown(wait=True)
+        drain_pdf_futures()
+        PDF_POOL.shutdown(wait=True)
+        SESSION.close()
 
     print("\n" + "="*50)
     print(f"ARCHIVAL COMPLETE. FILES IN: {ABS_OUTPUT_PATH}")